@@ -3,18 +3,68 @@ Flask application for Globel Interiors India Invoice Automation
 """
 
 from flask import Flask, render_template, request, send_file, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import hmac
 import json
 import os
+import tempfile
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 from utils.pdf_generator import generate_invoice_pdf, WEASYPRINT_AVAILABLE
 from utils.tax_calculator import calculate_tax
 from utils.number_to_words import amount_to_words
 from utils.pdf_extractor import extract_data_from_pdf
 
+# orjson is optional; fall back to stdlib json if it isn't installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Load environment variables from .env file
 load_dotenv()
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that uses orjson for jsonify() and request.get_json()"""
+
+    def dumps(self, obj, **kwargs):
+        # Keep the default provider's key order and debug indentation
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+
+# gzip/br-compress HTML invoices and jsonify() responses for clients that accept it.
+# Config files sent by send_json_config are direct passthrough and stay uncompressed.
+Compress(app)
+
+# Background PDF extraction jobs. Jobs are kept in-process, so they are only
+# visible to the worker that accepted the upload (gunicorn runs one by default).
+extraction_executor = ThreadPoolExecutor(max_workers=4)
+extraction_jobs = {}  # job_id -> (submitted_at, Future)
+extraction_jobs_lock = threading.Lock()  # request threads share extraction_jobs
+EXTRACTION_JOB_TTL = 15 * 60  # seconds before an unclaimed job is discarded
+
+# Serializes read-modify-write of product_catalog.json across request threads
+catalog_lock = threading.Lock()
+
+# Single background writer for saving HTML invoices (testing mode without WeasyPrint)
+file_write_executor = ThreadPoolExecutor(max_workers=1)
 
 # Load configuration files
 def load_json_config(filename):
@@ -23,6 +73,54 @@ def load_json_config(filename):
     with open(filepath, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def write_json_config(filepath, data):
+    """
+    Write a JSON configuration file atomically.
+
+    Data is written and fsynced to a uniquely named temp file which then
+    replaces the original, so a crash mid-write never leaves a truncated
+    config behind and concurrent writers never share a temp file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath),
+                                    prefix=os.path.basename(filepath) + '.', suffix='.tmp')
+    try:
+        if ORJSON_AVAILABLE:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        # mkstemp creates the file as 0600; keep the original file's permissions
+        os.chmod(tmp_path, os.stat(filepath).st_mode if os.path.exists(filepath) else 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def send_json_config(filename):
+    """
+    Send a JSON configuration file as-is.
+
+    Skips the parse/serialize round-trip and lets clients revalidate with
+    If-None-Match / If-Modified-Since (304 when the file is unchanged).
+    """
+    filepath = os.path.abspath(os.path.join('config', filename))
+    return send_file(
+        filepath,
+        mimetype='application/json',
+        conditional=True,
+        etag=True,
+        last_modified=os.path.getmtime(filepath)
+    )
+
+# Company info (supplier state, bank details) is static; load it once at import
+COMPANY_INFO = load_json_config('company_info.json')
+
 @app.route('/')
 def index():
     """Serve main invoice form"""
@@ -32,8 +130,7 @@ def index():
 def get_products():
     """Return product catalog"""
     try:
-        products = load_json_config('product_catalog.json')
-        return jsonify(products)
+        return send_json_config('product_catalog.json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -50,32 +147,32 @@ def add_product():
         if not data.get('hsn_code') or not data.get('hsn_code').strip():
             return jsonify({'error': 'HSN code is required'}), 400
 
-        # Load existing catalog
-        filepath = os.path.join('config', 'product_catalog.json')
-        with open(filepath, 'r', encoding='utf-8') as f:
-            catalog = json.load(f)
-
-        # Check for duplicate names (case-insensitive)
-        new_name = data['name'].strip()
-        existing_names = [p['name'].lower() for p in catalog['products']]
-        if new_name.lower() in existing_names:
-            return jsonify({'error': 'A product with this name already exists'}), 409
-
-        # Generate new ID
-        max_id = max([p['id'] for p in catalog['products']], default=0)
-        new_id = max_id + 1
-
-        # Create new product
-        new_product = {
-            'id': new_id,
-            'name': new_name,
-            'hsn_code': data['hsn_code'].strip()
-        }
-
-        # Add to catalog and save
-        catalog['products'].append(new_product)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(catalog, f, indent=2, ensure_ascii=False)
+        with catalog_lock:
+            # Load existing catalog
+            filepath = os.path.join('config', 'product_catalog.json')
+            with open(filepath, 'r', encoding='utf-8') as f:
+                catalog = json.load(f)
+
+            # Check for duplicate names (case-insensitive)
+            new_name = data['name'].strip()
+            existing_names = [p['name'].lower() for p in catalog['products']]
+            if new_name.lower() in existing_names:
+                return jsonify({'error': 'A product with this name already exists'}), 409
+
+            # Generate new ID
+            max_id = max([p['id'] for p in catalog['products']], default=0)
+            new_id = max_id + 1
+
+            # Create new product
+            new_product = {
+                'id': new_id,
+                'name': new_name,
+                'hsn_code': data['hsn_code'].strip()
+            }
+
+            # Add to catalog and save
+            catalog['products'].append(new_product)
+            write_json_config(filepath, catalog)
 
         return jsonify({
             'success': True,
@@ -90,8 +187,7 @@ def add_product():
 def get_states():
     """Return state codes"""
     try:
-        states = load_json_config('state_codes.json')
-        return jsonify(states)
+        return send_json_config('state_codes.json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -99,8 +195,27 @@ def get_states():
 def get_company_info():
     """Return company information"""
     try:
-        company = load_json_config('company_info.json')
-        return jsonify(company)
+        return send_json_config('company_info.json')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_config():
+    """
+    Re-read company_info.json from disk in the worker handling this request.
+
+    Disabled unless ADMIN_TOKEN is set; callers must send it in X-Admin-Token.
+    """
+    global COMPANY_INFO
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Invalid admin token'}), 403
+
+    try:
+        COMPANY_INFO = load_json_config('company_info.json')
+        return jsonify({'success': True, 'message': 'Configuration reloaded'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,10 +223,13 @@ def get_company_info():
 @app.route('/api/extract-pdf', methods=['POST'])
 def extract_pdf_data():
     """
-    Extract invoice/PO data from uploaded PDF using GPT-4 Vision.
+    Start extracting invoice/PO data from uploaded PDF using GPT-4 Vision.
+
+    Extraction runs in the background so the request returns immediately;
+    poll /api/extract-pdf/<job_id> for the result.
 
     Expects: multipart/form-data with 'pdf' file
-    Returns: JSON with extracted data or error
+    Returns: 202 with JSON {'job_id': str, 'status': 'pending'} or error
     """
     try:
         # Check for file in request
@@ -135,26 +253,79 @@ def extract_pdf_data():
         if file_size > 10 * 1024 * 1024:
             return jsonify({'error': 'PDF file too large (max 10MB)'}), 400
 
+        # Check PDF magic bytes before reading the whole upload
+        head = pdf_file.read(4)
+        if head != b'%PDF':
+            return jsonify({'error': 'File is not a valid PDF'}), 400
+
         # Get API key
         api_key = os.environ.get('OPENAI_API_KEY')
         if not api_key or api_key == 'sk-your-api-key-here':
             return jsonify({'error': 'OpenAI API key not configured. Please set OPENAI_API_KEY in .env file'}), 500
 
-        # Read PDF bytes
-        pdf_bytes = pdf_file.read()
+        # Read remaining PDF bytes
+        pdf_bytes = head + pdf_file.read()
 
-        # Extract data
-        result = extract_data_from_pdf(pdf_bytes, api_key)
+        # Queue extraction
+        job_id = uuid.uuid4().hex
+        future = extraction_executor.submit(extract_data_from_pdf, pdf_bytes, api_key)
 
-        if result.get('success'):
-            return jsonify(result)
-        else:
-            return jsonify(result), 400
+        now = time.time()
+        with extraction_jobs_lock:
+            # Drop jobs that were never collected
+            for stale_id in [stale_id for stale_id, (submitted_at, _) in extraction_jobs.items()
+                             if now - submitted_at > EXTRACTION_JOB_TTL]:
+                del extraction_jobs[stale_id]
+            extraction_jobs[job_id] = (now, future)
+
+        return jsonify({'job_id': job_id, 'status': 'pending'}), 202
+
+    except Exception as e:
+        print(f"Error in PDF extraction: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/extract-pdf/<job_id>')
+def extract_pdf_status(job_id):
+    """
+    Return the result of a PDF extraction job.
+
+    Returns: 202 while the job is running, then the extraction result
+    (same shape as extract_data_from_pdf) once; 404 for unknown jobs.
+    """
+    with extraction_jobs_lock:
+        job = extraction_jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown or expired extraction job'}), 404
+
+        _, future = job
+        if not future.done():
+            return jsonify({'job_id': job_id, 'status': 'pending'}), 202
 
+        del extraction_jobs[job_id]
+
+    try:
+        result = future.result()
     except Exception as e:
         print(f"Error in PDF extraction: {e}")
         return jsonify({'error': str(e)}), 500
 
+    if result.get('success'):
+        return jsonify(result)
+    else:
+        return jsonify(result), 400
+
+
+def save_invoice_html(save_path, html_bytes):
+    """Write a generated HTML invoice to disk (runs on file_write_executor)"""
+    try:
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)  # Create directory if it doesn't exist
+        with open(save_path, 'wb') as f:
+            f.write(html_bytes)
+        print(f"[OK] Invoice saved to: {save_path}")
+    except Exception as e:
+        print(f"Error saving invoice HTML: {e}")
+
 
 @app.route('/generate-invoice', methods=['POST'])
 def generate_invoice():
@@ -202,14 +373,14 @@ def generate_invoice():
                 return jsonify({'error': f'Missing required field: {field}'}), 400
 
         # Calculate subtotal from products
-        subtotal = sum([float(p.get('amount', 0)) for p in data['products']])
+        subtotal = sum(float(p.get('amount', 0)) for p in data['products'])
 
         # Add packing charges
         packing_charges = float(data.get('packing_charges', 0))
         total_before_tax = subtotal + packing_charges
 
-        # Load company information to get supplier state
-        company_info = load_json_config('company_info.json')
+        # Company information (supplier state) is loaded once at startup
+        company_info = COMPANY_INFO
 
         # Calculate tax based on SUPPLIER state vs CUSTOMER (billing) state
         # This is the correct GST rule: Delhi (supplier) vs Punjab (customer) = IGST
@@ -250,28 +421,21 @@ def generate_invoice():
         # Return file with appropriate mimetype
         if WEASYPRINT_AVAILABLE:
             return send_file(
-                pdf_bytes,
+                BytesIO(pdf_bytes),
                 mimetype='application/pdf',
                 as_attachment=True,
                 download_name=f"Invoice_{data['invoice_no']}.pdf"
             )
         else:
             # Return HTML directly in browser (testing mode without WeasyPrint)
-            html_content = pdf_bytes.read().decode('utf-8')
-
-            # Save HTML to local file
-            invoice_dir = 'generated_invoices'
-            os.makedirs(invoice_dir, exist_ok=True)  # Create directory if it doesn't exist
+            html_bytes = pdf_bytes
 
+            # Save HTML to local file in the background; the response doesn't wait on disk
             invoice_filename = f"Invoice_{data['invoice_no']}.html"
-            save_path = os.path.join(invoice_dir, invoice_filename)
+            save_path = os.path.join('generated_invoices', invoice_filename)
+            file_write_executor.submit(save_invoice_html, save_path, html_bytes)
 
-            with open(save_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-
-            print(f"[OK] Invoice saved to: {save_path}")
-
-            return Response(html_content, mimetype='text/html')
+            return Response(html_bytes, mimetype='text/html')
 
     except Exception as e:
         print(f"Error generating invoice: {e}")
@@ -280,6 +444,7 @@ def generate_invoice():
 if __name__ == '__main__':
     # Run Flask application
     port = int(os.environ.get('PORT', 5000))
+
     print("Starting Globel Interiors India Invoice Automation System...")
     print(f"Access the application at: http://localhost:{port}")
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -533,6 +533,7 @@ function showToast(message, type = 'info') {
 // ==========================================
 
 let extractedData = null;
+const EXTRACT_POLL_INTERVAL_MS = 1000;
 
 /**
  * Initialize PDF extraction handlers
@@ -632,12 +633,19 @@ async function extractPdfData() {
         const formData = new FormData();
         formData.append('pdf', file);
 
-        const response = await fetch('/api/extract-pdf', {
+        let response = await fetch('/api/extract-pdf', {
             method: 'POST',
             body: formData
         });
 
-        const result = await response.json();
+        let result = await response.json();
+
+        // Extraction runs in the background - poll until the job finishes
+        while (response.status === 202 && result.job_id) {
+            await new Promise(resolve => setTimeout(resolve, EXTRACT_POLL_INTERVAL_MS));
+            response = await fetch(`/api/extract-pdf/${result.job_id}`);
+            result = await response.json();
+        }
 
         if (!response.ok || !result.success) {
             throw new Error(result.error || 'Extraction failed');
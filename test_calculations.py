@@ -3,7 +3,8 @@ Test script to verify invoice calculations
 """
 import json
 from utils.tax_calculator import calculate_tax
-from utils.number_to_words import amount_to_words
+from num2words import num2words
+from utils.number_to_words import amount_to_words, _number_to_words
 
 def test_calculation(test_file):
     """Test calculations for a given test data file"""
@@ -16,7 +17,7 @@ def test_calculation(test_file):
         data = json.load(f)
 
     # Calculate subtotal
-    subtotal = sum([p['amount'] for p in data['products']])
+    subtotal = sum(p['amount'] for p in data['products'])
     print(f"\n1. Products Subtotal: Rs.{subtotal:,.2f}")
 
     # Add packing
@@ -57,7 +58,19 @@ def test_calculation(test_file):
 
     return tax_info
 
+def test_number_to_words_matches_num2words():
+    """Built-in Indian number words must match num2words(n, lang='en_IN')"""
+    boundaries = []
+    for unit in (1_000, 100_000, 10_000_000, 990_000_000, 1_000_000_000):
+        boundaries += [unit - 1, unit, unit + 1]
+    for n in [*range(1001), *boundaries]:
+        expected = num2words(n, lang='en_IN')
+        assert _number_to_words(n) == expected, f"{n}: {_number_to_words(n)!r} != {expected!r}"
+
 if __name__ == '__main__':
+    test_number_to_words_matches_num2words()
+    print("Number to words: matches num2words (0-1000 and unit boundaries)")
+
     # Test Interstate transaction (Delhi to Punjab - should be IGST)
     print("\n" + "="*60)
     print("TEST CASE 1: INTERSTATE TRANSACTION")
@@ -0,0 +1,135 @@
+"""
+Tests for the text-layer fast path of the PDF extractor (no GPT calls).
+
+Run with: python -m pytest test_fast_extract.py  (or python test_fast_extract.py)
+"""
+from utils.pdf_extractor import _try_fast_extract, extract_text_from_pdf, load_state_mapping
+
+HEADER = "Sr Description HSN Qty UOM Rate Amount"
+ROWS = [
+    "1 Centre Table-Rubber wood lacquer Polish 44071020 1 UNT 4500.00 4500.00",
+    "2 Corner table steel stand folding 44071020 2 Unit 2700.00 5400.00",
+]
+TOTAL = "Total Amount Before Tax: 9900.00"
+PARTIES = [
+    "Bill To: Star Dental Centre Pvt. Ltd.",
+    "CS 1/2, Shipra Riviera, Indirapuram, Ghaziabad - 201014",
+    "GSTIN: 09AAPCS5927C2Z0",
+    "Ship To: Star Dental Centre Pvt. Ltd. (CLOVE DENTAL)",
+    "18, Advocate Chamber, RDC, Raj Nagar, Ghaziabad 201002",
+    "GSTIN: 09AAPCS5927C2Z0",
+]
+
+
+def make_po(header=HEADER, rows=ROWS, total=TOTAL, parties=PARTIES, footer=()):
+    """Build the text layer of a cleanly structured purchase order"""
+    return "\n".join([
+        "--- PAGE 1 ---",
+        "PURCHASE ORDER",
+        "PO No: 25PON/2554",
+        "PO Date: 05/12/2025",
+        *parties,
+        header,
+        *rows,
+        total,
+        *footer,
+    ])
+
+
+def fast_extract(text):
+    return _try_fast_extract(text, load_state_mapping())
+
+
+def test_clean_po_is_parsed():
+    data = fast_extract(make_po())
+    assert data is not None
+    assert data["po"] == "25PON/2554"
+    assert data["invoice_date"] == "05/12/2025"
+    assert data["billing"]["gstin"] == "09AAPCS5927C2Z0"
+    assert data["billing"]["state_code"] == "09"
+    assert data["billing"]["address"] == "CS 1/2, Shipra Riviera, Indirapuram, Ghaziabad - 201014"
+    assert data["packing_charges"] == 0
+    assert data["products"] == [
+        {"name": "Centre Table-Rubber wood lacquer Polish", "hsn_code": "44071020",
+         "quantity": 1, "rate": 4500.0},
+        {"name": "Corner table steel stand folding", "hsn_code": "44071020",
+         "quantity": 2, "rate": 2700.0},
+    ]
+
+
+def test_packing_after_total_is_parsed():
+    data = fast_extract(make_po(footer=["Packing & Forwarding: 500.00"]))
+    assert data is not None
+    assert data["packing_charges"] == 500
+
+
+def test_other_amount_after_total_is_rejected():
+    assert fast_extract(make_po(footer=["Installation Charges: 500.00"])) is None
+    assert fast_extract(make_po(footer=["IGST @ 18%: 1782.00"])) is None
+
+
+def test_interleaved_party_blocks_are_rejected():
+    parties = [
+        "Bill To: Star Dental Centre Pvt. Ltd.",
+        "CS 1/2, Shipra Riviera",
+        "Ship To: Clove Dental Raj Nagar",
+        "18, Advocate Chamber",
+        "GSTIN: 09AAPCS5927C2Z0",
+    ]
+    assert fast_extract(make_po(parties=parties)) is None
+
+
+def test_wrapped_description_is_rejected():
+    rows = ["1 Centre Table-Rubber wood 44071020 1 UNT 4500.00 4500.00",
+            "lacquer Polish",
+            ROWS[1]]
+    assert fast_extract(make_po(rows=rows)) is None
+
+
+def test_wrapped_description_on_last_row_is_rejected():
+    rows = [ROWS[0],
+            "2 Corner table steel stand 44071020 2 Unit 2700.00 5400.00",
+            "folding with glass top (2x2)"]
+    assert fast_extract(make_po(rows=rows)) is None
+
+
+def test_rate_before_quantity_is_rejected():
+    header = "Sr Description HSN Rate Qty Amount"
+    rows = ["1 Centre Table 44071020 4500.00 2.00 9000.00",
+            "2 Corner table 44071020 900.00 1.00 900.00"]
+    assert fast_extract(make_po(header=header, rows=rows)) is None
+
+
+def test_rate_percent_header_is_rejected():
+    header = "Sr Description HSN Qty UOM Rate % Amount"
+    assert fast_extract(make_po(header=header)) is None
+
+
+def test_missing_header_is_rejected():
+    assert fast_extract(make_po(header="Items")) is None
+
+
+def test_quantity_rate_amount_mismatch_is_rejected():
+    rows = [ROWS[0], "2 Corner table steel stand folding 44071020 2 Unit 2700.00 5310.00"]
+    assert fast_extract(make_po(rows=rows, total="Total Amount Before Tax: 9810.00")) is None
+
+
+def test_total_mismatch_is_rejected():
+    assert fast_extract(make_po(total="Total Amount Before Tax: 9000.00")) is None
+
+
+def test_missing_total_is_rejected():
+    assert fast_extract(make_po(total="")) is None
+
+
+def test_bundled_purchase_order_falls_back_to_gpt():
+    with open("2554 Globel Interior.pdf", "rb") as f:
+        text = extract_text_from_pdf(f.read())
+    assert fast_extract(text) is None
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
@@ -2,6 +2,57 @@
 
 from num2words import num2words
 
+_ONES = [
+    'zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine',
+    'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen', 'sixteen',
+    'seventeen', 'eighteen', 'nineteen'
+]
+_TENS = ['', '', 'twenty', 'thirty', 'forty', 'fifty', 'sixty', 'seventy', 'eighty', 'ninety']
+
+# Indian numbering units, largest first
+_INDIAN_UNITS = ((10_000_000, 'crore'), (100_000, 'lakh'), (1000, 'thousand'), (100, 'hundred'))
+
+# _to_words_indian handles up to 99 crore; larger amounts go through num2words
+_MAX_INDIAN = 1_000_000_000
+
+
+def _two_digits_to_words(n):
+    """Convert 0-99 to words (e.g. 45 -> "forty-five")"""
+    if n < 20:
+        return _ONES[n]
+    tens, ones = divmod(n, 10)
+    return _TENS[tens] + ('-' + _ONES[ones] if ones else '')
+
+
+def _to_words_indian(n):
+    """
+    Convert a non-negative integer below _MAX_INDIAN to Indian English words.
+
+    Output matches num2words(n, lang='en_IN'), e.g.
+    1234567 -> "twelve lakh, thirty-four thousand, five hundred and sixty-seven"
+    """
+    if n < 100:
+        return _two_digits_to_words(n)
+
+    parts = []
+    for divisor, unit in _INDIAN_UNITS:
+        count, n = divmod(n, divisor)
+        if count:
+            parts.append(f"{_two_digits_to_words(count)} {unit}")
+
+    words = ', '.join(parts)
+    if n:
+        words += ' and ' + _two_digits_to_words(n)
+    return words
+
+
+def _number_to_words(n):
+    """Convert an integer to Indian English words, falling back to num2words out of range"""
+    if 0 <= n < _MAX_INDIAN:
+        return _to_words_indian(n)
+    return num2words(n, lang='en_IN')
+
+
 def amount_to_words(amount):
     """
     Convert amount to Indian rupees format words.
@@ -18,11 +69,11 @@ def amount_to_words(amount):
         paise = round((amount - rupees) * 100)
 
         # Convert rupees to words using Indian English
-        words = "Rupees " + num2words(rupees, lang='en_IN').title()
+        words = "Rupees " + _number_to_words(rupees).title()
 
         # Add paise if present
         if paise > 0:
-            words += " and Paise " + num2words(paise, lang='en_IN').title()
+            words += " and Paise " + _number_to_words(paise).title()
 
         words += " Only"
         return words
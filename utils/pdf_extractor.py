@@ -4,12 +4,17 @@ PDF Invoice Data Extraction using OpenAI GPT-4 Vision
 This module extracts structured data from PDF invoices/POs using GPT-4V.
 """
 
-import base64
+import copy
+import hashlib
 import json
 import os
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
-from typing import Optional, Tuple
+from types import MappingProxyType
+from typing import NamedTuple, Optional, Tuple
 
 # Try PyMuPDF first (no system dependencies), fallback to pdf2image
 try:
@@ -18,16 +23,138 @@ try:
 except ImportError:
     PDF_LIBRARY = None
 
+# pybase64 is optional (SIMD-accelerated, same API); fall back to stdlib base64
+try:
+    import pybase64 as _b64
+except ImportError:
+    import base64 as _b64
+
+# orjson is optional; fall back to stdlib json if it isn't installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+import httpx
 from PIL import Image
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
+
+# Upper bound on page rasterization DPI
+MAX_RENDER_DPI = 110
+
+# Longest image side that is useful for each OpenAI image detail level
+IMAGE_MAX_SIZE_FOR_DETAIL = {"low": 512, "auto": 1568, "high": 1568}
+
+# Common state abbreviations mapping (read-only, shared across requests)
+_ABBREVIATIONS = MappingProxyType({
+    'UP': 'Uttar Pradesh',
+    'DL': 'Delhi',
+    'HR': 'Haryana',
+    'PB': 'Punjab',
+    'RJ': 'Rajasthan',
+    'MH': 'Maharashtra',
+    'GJ': 'Gujarat',
+    'KA': 'Karnataka',
+    'TN': 'Tamil Nadu',
+    'WB': 'West Bengal',
+    'MP': 'Madhya Pradesh',
+    'AP': 'Andhra Pradesh',
+    'TS': 'Telangana',
+    'KL': 'Kerala',
+    'BR': 'Bihar',
+    'JH': 'Jharkhand',
+    'OR': 'Odisha',
+    'OD': 'Odisha',
+    'CG': 'Chhattisgarh',
+    'UK': 'Uttarakhand',
+    'HP': 'Himachal Pradesh',
+    'JK': 'Jammu and Kashmir',
+    'GA': 'Goa',
+    'AS': 'Assam',
+    'CH': 'Chandigarh',
+    'SK': 'Sikkim',
+    'MN': 'Manipur',
+    'ML': 'Meghalaya',
+    'MZ': 'Mizoram',
+    'NL': 'Nagaland',
+    'TR': 'Tripura',
+    'AR': 'Arunachal Pradesh',
+    'PY': 'Puducherry',
+})
+
+class _StateIndex(NamedTuple):
+    """Lookup tables built from one state name -> code mapping"""
+    state_mapping: dict
+    code_to_name: dict    # "09" -> "Uttar Pradesh" (first name for each code)
+    lower_to_state: dict  # "uttar pradesh" -> ("Uttar Pradesh", "09")
+    abbr_to_state: dict   # "UP" -> ("Uttar Pradesh", "09")
+    lower_states: tuple   # (("uttar pradesh", "Uttar Pradesh", "09"), ...) in mapping order
+
+    # Compared and hashed by identity so an index can key the normalization cache
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+
+# Lookup tables per state mapping, keyed by id(); the mapping itself is
+# kept alongside so its id cannot be reused while the entry exists.
+_STATE_INDEXES = {}
+_STATE_INDEXES_LOCK = threading.Lock()
+
+
+def _state_index(state_mapping: dict) -> _StateIndex:
+    """
+    Return the lookup tables for a state mapping, building them on first use.
+    """
+    index = _STATE_INDEXES.get(id(state_mapping))
+    if index is not None and index.state_mapping is state_mapping:
+        return index
+
+    with _STATE_INDEXES_LOCK:
+        index = _STATE_INDEXES.get(id(state_mapping))
+        if index is not None and index.state_mapping is state_mapping:
+            return index
+        if len(_STATE_INDEXES) >= 8:
+            _STATE_INDEXES.clear()
+        code_to_name = {}
+        for name, code in state_mapping.items():
+            code_to_name.setdefault(code, name)
+        index = _StateIndex(
+            state_mapping=state_mapping,
+            code_to_name=code_to_name,
+            lower_to_state={name.lower(): (name, code) for name, code in state_mapping.items()},
+            abbr_to_state={abbr: (name, state_mapping.get(name)) for abbr, name in _ABBREVIATIONS.items()},
+            lower_states=tuple((name.lower(), name, code) for name, code in state_mapping.items())
+        )
+        _STATE_INDEXES[id(state_mapping)] = index
+    return index
 
 
+@lru_cache(maxsize=4)
+def _get_client(api_key: str) -> OpenAI:
+    """
+    Return a shared OpenAI client for this API key.
+    Reusing the client keeps its HTTP connection pool (and TLS sessions) alive
+    across extractions instead of handshaking on every upload.
+    """
+    return OpenAI(
+        api_key=api_key,
+        # DefaultHttpxClient keeps the SDK's timeout/redirect defaults; only the pool limit changes
+        http_client=DefaultHttpxClient(limits=httpx.Limits(max_keepalive_connections=8))
+    )
+
+
+@lru_cache(maxsize=1)
 def load_state_mapping() -> dict:
-    """Load state name to code mapping for normalization"""
+    """Load state name to code mapping for normalization (parsed once per process)"""
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)),
                                'config', 'state_codes.json')
-    with open(config_path, 'r') as f:
-        data = json.load(f)
+    if ORJSON_AVAILABLE:
+        with open(config_path, 'rb') as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(config_path, 'r') as f:
+            data = json.load(f)
     return data['states']
 
 
@@ -45,142 +172,326 @@ def normalize_state_name(state_input: str, state_mapping: dict) -> Tuple[Optiona
     if not state_input:
         return None, None
 
-    state_input = state_input.strip()
-
-    # Common abbreviations mapping
-    abbreviations = {
-        'UP': 'Uttar Pradesh',
-        'DL': 'Delhi',
-        'HR': 'Haryana',
-        'PB': 'Punjab',
-        'RJ': 'Rajasthan',
-        'MH': 'Maharashtra',
-        'GJ': 'Gujarat',
-        'KA': 'Karnataka',
-        'TN': 'Tamil Nadu',
-        'WB': 'West Bengal',
-        'MP': 'Madhya Pradesh',
-        'AP': 'Andhra Pradesh',
-        'TS': 'Telangana',
-        'KL': 'Kerala',
-        'BR': 'Bihar',
-        'JH': 'Jharkhand',
-        'OR': 'Odisha',
-        'OD': 'Odisha',
-        'CG': 'Chhattisgarh',
-        'UK': 'Uttarakhand',
-        'HP': 'Himachal Pradesh',
-        'JK': 'Jammu and Kashmir',
-        'GA': 'Goa',
-        'AS': 'Assam',
-        'CH': 'Chandigarh',
-        'SK': 'Sikkim',
-        'MN': 'Manipur',
-        'ML': 'Meghalaya',
-        'MZ': 'Mizoram',
-        'NL': 'Nagaland',
-        'TR': 'Tripura',
-        'AR': 'Arunachal Pradesh',
-        'PY': 'Puducherry',
-    }
+    return _normalize_state_name(state_input.strip(), _state_index(state_mapping))
+
+
+@lru_cache(maxsize=256)
+def _normalize_state_name(state_input: str, index: _StateIndex) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Cached body of normalize_state_name. The index is passed in rather than
+    looked up, so clearing _STATE_INDEXES from another thread cannot affect it.
+    """
+    upper_input = state_input.upper()
+
+    # Check abbreviation ("UP", "DL") - the most common short form
+    state = index.abbr_to_state.get(upper_input)
+    if state is not None:
+        return state
 
     # Check for format like "UP-09" or "DL-07"
-    match = re.match(r'^([A-Z]{2})-?(\d{2})$', state_input.upper())
-    if match:
-        abbr = match.group(1)
-        if abbr in abbreviations:
-            state_name = abbreviations[abbr]
-            return state_name, state_mapping.get(state_name)
+    if (len(upper_input) == 4 or (len(upper_input) == 5 and upper_input[2] == '-')) \
+            and upper_input[-2:].isdecimal():
+        state = index.abbr_to_state.get(upper_input[:2])
+        if state is not None:
+            return state
 
     # Check if it's just a state code (2 digits)
-    if re.match(r'^\d{2}$', state_input):
-        for name, code in state_mapping.items():
-            if code == state_input:
-                return name, code
-        return None, state_input
-
-    # Check abbreviation
-    upper_input = state_input.upper()
-    if upper_input in abbreviations:
-        state_name = abbreviations[upper_input]
-        return state_name, state_mapping.get(state_name)
+    if len(state_input) == 2 and state_input.isdecimal():
+        return index.code_to_name.get(state_input), state_input
 
     # Direct match (case-insensitive)
-    for name, code in state_mapping.items():
-        if name.lower() == state_input.lower():
-            return name, code
-
-    # Partial match
-    for name, code in state_mapping.items():
-        if state_input.lower() in name.lower():
+    lower_input = state_input.lower()
+    state = index.lower_to_state.get(lower_input)
+    if state is not None:
+        return state
+
+    # Partial match against pre-lowercased names
+    for lower_name, name, code in index.lower_states:
+        if lower_input in lower_name:
             return name, code
 
     return state_input, None
 
 
-def pdf_to_images(pdf_bytes: bytes, max_pages: int = 2) -> list:
+def _pixmap_to_jpeg(pix, quality: int = 85) -> bytes:
     """
-    Convert PDF bytes to list of PIL Images.
-    Returns list of (page_number, image) tuples.
+    Encode a PyMuPDF pixmap as JPEG bytes.
+    Falls back to Pillow if this PyMuPDF build cannot write JPEG.
     """
-    images = []
+    try:
+        return pix.tobytes("jpeg", jpg_quality=quality)
+    except (TypeError, ValueError):
+        # frombuffer wraps the pixmap samples without copying; pix outlives image here
+        image = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", 0, 1)
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
 
-    if PDF_LIBRARY == "pymupdf":
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        for page_num in range(min(len(doc), max_pages)):
-            page = doc[page_num]
-            # Render at 200 DPI for better text clarity (especially for small text)
-            mat = fitz.Matrix(200/72, 200/72)
-            pix = page.get_pixmap(matrix=mat)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append((page_num + 1, img))
-        doc.close()
-    else:
+
+# PyMuPDF does not support multithreading, and the resource store is global.
+# Every use of fitz holds this lock; only the OpenAI call runs concurrently.
+_MUPDF_LOCK = threading.Lock()
+
+
+def _open_pdf(pdf_bytes: bytes):
+    """Open PDF bytes as a PyMuPDF document"""
+    if PDF_LIBRARY != "pymupdf":
         raise ImportError("PyMuPDF not available. Install with: pip install PyMuPDF")
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
 
-    return images
 
+def _empty_mupdf_store():
+    """
+    Empty MuPDF's global resource cache (fonts, images).
+    Each upload is a different document, so cached resources are rarely reused
+    and would otherwise accumulate for the lifetime of the process.
+    """
+    fitz.TOOLS.store_shrink(100)
 
-def extract_text_from_pdf(pdf_bytes: bytes, max_pages: int = 2) -> str:
+
+def _render_pages(doc, max_pages: int = 2, max_size: int = 1568) -> list:
     """
-    Extract raw text from PDF using PyMuPDF.
-    This provides accurate text without OCR errors.
+    Render the first max_pages pages of an open document to JPEG bytes.
+    The render scale is capped so the longer side is at most max_size pixels,
+    so each page is rasterized at its final size and never resized afterwards.
     """
-    if PDF_LIBRARY != "pymupdf":
-        raise ImportError("PyMuPDF not available. Install with: pip install PyMuPDF")
+    images = []
+    for page_num in range(min(len(doc), max_pages)):
+        page = doc[page_num]
+        # Render at the DPI that yields max_size on the longer side (PDF units are 1/72 inch),
+        # never above MAX_RENDER_DPI - exact values come from the text layer anyway
+        target_dpi = min(MAX_RENDER_DPI, max_size * 72 / max(page.rect.width, page.rect.height))
+        mat = fitz.Matrix(target_dpi / 72, target_dpi / 72)
+        pix = page.get_pixmap(matrix=mat)
+        images.append((page_num + 1, _pixmap_to_jpeg(pix)))
+    return images
 
-    text_content = []
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
 
+def _extract_text(doc, max_pages: int = 2) -> str:
+    """Extract the raw text layer of the first max_pages pages of an open document"""
+    text_content = []
     for page_num in range(min(len(doc), max_pages)):
         page = doc[page_num]
         text = page.get_text("text")
         text_content.append(f"--- PAGE {page_num + 1} ---\n{text}")
-
-    doc.close()
     return "\n\n".join(text_content)
 
 
-def image_to_base64(image: Image.Image, max_size: int = 1568) -> str:
+def pdf_to_images(pdf_bytes: bytes, max_pages: int = 2, max_size: int = 1568) -> list:
     """
-    Convert PIL Image to base64 string, resizing if needed.
-    OpenAI recommends images under 1568x1568 for efficiency.
+    Convert PDF bytes to list of JPEG page images.
+    Returns list of (page_number, jpeg_bytes) tuples, with the longer side of
+    each image at most max_size pixels (OpenAI recommends under 1568x1568).
     """
-    # Resize if too large
-    if image.width > max_size or image.height > max_size:
-        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    with _MUPDF_LOCK:
+        doc = _open_pdf(pdf_bytes)
+        try:
+            return _render_pages(doc, max_pages, max_size)
+        finally:
+            doc.close()
 
-    # Convert to RGB if necessary
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
 
-    # Encode to base64
-    buffer = BytesIO()
-    image.save(buffer, format='JPEG', quality=85)
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+def extract_text_from_pdf(pdf_bytes: bytes, max_pages: int = 2) -> str:
+    """
+    Extract raw text from PDF using PyMuPDF.
+    This provides accurate text without OCR errors.
+    """
+    with _MUPDF_LOCK:
+        doc = _open_pdf(pdf_bytes)
+        try:
+            return _extract_text(doc, max_pages)
+        finally:
+            doc.close()
+
+
+# Patterns for the deterministic text-layer parser. Each only matches a label and
+# its value on the same line; anything looser is left to GPT.
+_GSTIN_RE = re.compile(r'\b(\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z])\b')
+_PO_NO_RE = re.compile(r'^\s*(?:P\.?\s?O\.?|Purchase\s+Order)\s*(?:No\.?|Number|#)\s*[:\-]\s*(\S+)\s*$', re.I)
+_DOC_DATE_RE = re.compile(r'^\s*(?:P\.?\s?O\.?|Order|Invoice|Document)?\s*Date\s*[:\-]\s*(\d{2})[/.\-](\d{2})[/.\-](\d{4})\s*$', re.I)
+_BILL_TO_RE = re.compile(r'^\s*Bill(?:ed)?\s+To\s*[:\-]\s*(\S.*?)\s*$', re.I)
+_SHIP_TO_RE = re.compile(r'^\s*Ship(?:ped)?\s+To\s*[:\-]\s*(\S.*?)\s*$', re.I)
+_GSTIN_LINE_RE = re.compile(r'^\s*GSTIN(?:\s+No\.?)?\s*[:\-]\s*([0-9A-Z]{15})\s*$', re.I)
+# Product table header with exactly these columns, in this order. Any other
+# layout (extra tax columns, "Rate %", rate before quantity) is left to GPT.
+_PRODUCT_HEADER_RE = re.compile(
+    r'^\s*(?:Sr|Sl|S)\.?\s*(?:No\.?)?\s+(?:Description(?:\s+of\s+Goods)?|Item|Particulars)\s+'
+    r'HSN(?:/SAC)?(?:\s+Code)?\s+(?:Qty|Quantity)\.?\s+(?:(?:UOM|Unit)\s+)?Rate\s+Amount\s*$', re.I
+)
+# Sr. No, description, HSN, quantity, optional unit, rate, amount - all on one line
+_PRODUCT_ROW_RE = re.compile(
+    r'^\s*(\d{1,3})[.)]?\s+(\S.*?\S)\s+(\d{4}|\d{6}|\d{8})\s+(\d+(?:\.\d+)?)\s+'
+    r'(?:[A-Za-z]{2,5}\s+)?([\d,]+\.\d{2})\s+([\d,]+\.\d{2})\s*$'
+)
+_TOTAL_BEFORE_TAX_RE = re.compile(
+    r'^\s*Total\s+Amount\s+Before\s+Tax\s*[:\-]?\s*(?:Rs\.?|INR)?\s*([\d,]+\.\d{2})\s*$', re.I
+)
+# Packing/freight charges listed after the before-tax total
+_PACKING_LINE_RE = re.compile(
+    r'^\s*(?:Packing|Packaging|Cartage|Freight|Forwarding)\b[A-Za-z&/ ]*[:\-]?\s*(?:Rs\.?|INR)?\s*([\d,]+\.\d{2})\s*$', re.I
+)
+_AMOUNT_RE = re.compile(r'\d\.\d{2}\b')
+# Labels that end a Bill To / Ship To block
+_BLOCK_END_PATTERNS = (_BILL_TO_RE, _SHIP_TO_RE, _PO_NO_RE, _DOC_DATE_RE, _PRODUCT_HEADER_RE)
+_GSTIN_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Our own GSTIN - never the customer's
+_OWN_GSTIN = '07AWXPS9168G1ZG'
+
+
+def _is_valid_gstin(gstin: str) -> bool:
+    """Validate a GSTIN's check digit (mod-36 Luhn variant)"""
+    if len(gstin) != 15 or any(c not in _GSTIN_CHARS for c in gstin):
+        return False
+    total = 0
+    for i, char in enumerate(gstin[:14]):
+        value = _GSTIN_CHARS.index(char) * (2 if i % 2 else 1)
+        total += value // 36 + value % 36
+    return gstin[14] == _GSTIN_CHARS[(36 - total % 36) % 36]
+
+
+def _parse_party_block(lines: list, start: int, first_line: str) -> Optional[dict]:
+    """
+    Parse a "Bill To: <name>" / "Ship To: <name>" block: the name, then
+    address lines up to a "GSTIN: <gstin>" line. Returns None if another
+    label starts before the GSTIN, since the blocks are then interleaved.
+    """
+    address_lines = []
+    for line in lines[start + 1:start + 8]:
+        if any(pattern.match(line) for pattern in _BLOCK_END_PATTERNS):
+            return None
+        gstin_match = _GSTIN_LINE_RE.match(line)
+        if gstin_match:
+            gstin = gstin_match.group(1).upper()
+            if not address_lines or not _is_valid_gstin(gstin):
+                return None
+            return {
+                "name": first_line,
+                "address": " ".join(address_lines),
+                "gstin": gstin
+            }
+        if not line.strip():
+            continue
+        address_lines.append(line.strip())
+    return None
+
+
+def _try_fast_extract(text: str, state_mapping: dict) -> Optional[dict]:
+    """
+    Parse cleanly structured PDF text without calling GPT.
+
+    Only succeeds when every field is unambiguous: one PO number, one date,
+    a Bill To block with a checksum-valid GSTIN, and a product table with a
+    "Sr / Description / HSN / Qty / [UOM] / Rate / Amount" header, rows
+    numbered 1..N each on one line with quantity x rate = amount, followed
+    directly by a "Total Amount Before Tax" line matching the row amounts.
+    Returns None otherwise, so the caller falls back to GPT.
+    """
+    lines = text.splitlines()
+    upper_text = text.upper()
+
+    if "PURCHASE ORDER" in upper_text:
+        document_type = "purchase_order"
+    elif "QUOTATION" in upper_text:
+        document_type = "quotation"
+    elif "INVOICE" in upper_text:
+        document_type = "invoice"
+    else:
+        return None
+
+    po_numbers = {m.group(1) for m in map(_PO_NO_RE.match, lines) if m}
+    dates = {f"{m.group(1)}/{m.group(2)}/{m.group(3)}" for m in map(_DOC_DATE_RE.match, lines) if m}
+    if len(po_numbers) != 1 or len(dates) != 1:
+        return None
+
+    billing = shipping = None
+    for i, line in enumerate(lines):
+        bill_match = _BILL_TO_RE.match(line)
+        ship_match = _SHIP_TO_RE.match(line)
+        if bill_match and billing is None:
+            billing = _parse_party_block(lines, i, bill_match.group(1))
+            if billing is None:
+                return None
+        elif ship_match and shipping is None:
+            shipping = _parse_party_block(lines, i, ship_match.group(1))
+            if shipping is None:
+                return None
+    if billing is None or billing["gstin"] == _OWN_GSTIN:
+        return None
+    shipping = shipping or dict(billing)
+
+    # Every GSTIN in the document must be valid, or the text layer is suspect
+    if not all(_is_valid_gstin(g) for g in _GSTIN_RE.findall(text)):
+        return None
+
+    header_rows = [i for i, line in enumerate(lines) if _PRODUCT_HEADER_RE.match(line)]
+    if len(header_rows) != 1:
+        return None
+
+    # Every line between the header and the total must be a complete product
+    # row; anything else (e.g. a wrapped description) means the layout is unclear
+    products = []
+    amounts_total = 0.0
+    before_tax_total = None
+    total_row = None
+    for i, line in enumerate(lines[header_rows[0] + 1:], header_rows[0] + 1):
+        if not line.strip():
+            continue
+        total_match = _TOTAL_BEFORE_TAX_RE.match(line)
+        if total_match:
+            before_tax_total = float(total_match.group(1).replace(',', ''))
+            total_row = i
+            break
+        match = _PRODUCT_ROW_RE.match(line)
+        if not match or int(match.group(1)) != len(products) + 1:
+            return None
+        quantity = float(match.group(4))
+        rate = float(match.group(5).replace(',', ''))
+        amount = float(match.group(6).replace(',', ''))
+        if abs(quantity * rate - amount) > 0.01:
+            return None
+        amounts_total += amount
+        products.append({
+            "name": match.group(2),
+            "hsn_code": match.group(3),
+            "quantity": int(quantity) if quantity.is_integer() else quantity,
+            "rate": rate
+        })
+    if not products or before_tax_total is None or abs(amounts_total - before_tax_total) > 0.01:
+        return None
+
+    # Packing/freight lines after the total are added as packing charges; any
+    # other amount (taxes, grand total, other charges) is left to GPT
+    packing_charges = 0.0
+    for line in lines[total_row + 1:]:
+        packing_match = _PACKING_LINE_RE.match(line)
+        if packing_match:
+            packing_charges += float(packing_match.group(1).replace(',', ''))
+        elif _AMOUNT_RE.search(line):
+            return None
+
+    code_to_name = _state_index(state_mapping).code_to_name
+    for party in (billing, shipping):
+        state_code = party["gstin"][:2]
+        party["state"] = code_to_name.get(state_code)
+        party["state_code"] = state_code
+        if party["state"] is None:
+            return None
+
+    return {
+        "document_type": document_type,
+        "po": po_numbers.pop(),
+        "invoice_date": dates.pop(),
+        "billing": billing,
+        "shipping": shipping,
+        "products": products,
+        "packing_charges": int(packing_charges) if packing_charges.is_integer() else packing_charges,
+        "extraction_confidence": "high",
+        "notes": "Parsed directly from the PDF text layer"
+    }
 
 
-def build_extraction_prompt(include_text_instructions: bool = False) -> str:
+def _build_extraction_prompt(include_text_instructions: bool = False) -> str:
     """
     Build the system prompt for GPT-4V to extract invoice/PO data.
     """
@@ -199,7 +510,7 @@ The image helps you understand which text belongs to which field (billing vs shi
     return f"""You are an expert at extracting structured data from Indian business documents (invoices, purchase orders, quotations).
 {text_instructions}
 IMPORTANT CONTEXT:
-- This document is being processed by Globel Interiors India (GSTIN: 07AWXPS9168G1ZG, Delhi)
+- This document is being processed by Globel Interiors India (GSTIN: {_OWN_GSTIN}, Delhi)
 - If this is a Purchase Order, Globel Interiors is the VENDOR/SUPPLIER receiving the order
 - The CUSTOMER/BUYER details should be extracted as billing/shipping info
 - DO NOT extract Globel Interiors' own details as billing/shipping
@@ -266,44 +577,110 @@ If a field cannot be determined, use null.
 Respond with ONLY the JSON object, no explanations."""
 
 
-def extract_data_from_pdf(pdf_bytes: bytes, api_key: str) -> dict:
+# Layout images are sent at low detail, which OpenAI downsamples to fit 512x512;
+# render them at that size so no pixels are produced only to be discarded
+LAYOUT_IMAGE_DETAIL = "low"
+LAYOUT_IMAGE_MAX_SIZE = IMAGE_MAX_SIZE_FOR_DETAIL[LAYOUT_IMAGE_DETAIL]
+
+# Both prompt variants are static, so build them once
+_PROMPT_WITH_TEXT = _build_extraction_prompt(include_text_instructions=True)
+_PROMPT_PLAIN = _build_extraction_prompt(include_text_instructions=False)
+
+
+def build_extraction_prompt(include_text_instructions: bool = False) -> str:
+    """
+    Return the system prompt for GPT-4V to extract invoice/PO data.
+    """
+    return _PROMPT_WITH_TEXT if include_text_instructions else _PROMPT_PLAIN
+
+# Successful extraction results keyed by blake2b digest of the PDF bytes (LRU).
+# Guarded by a lock since extractions run on background threads.
+_RESULT_CACHE = OrderedDict()
+_RESULT_CACHE_SIZE = 128
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def extract_data_from_pdf(pdf_bytes: bytes, api_key: str, client: Optional[OpenAI] = None) -> dict:
     """
     Main function to extract invoice data from PDF using GPT-4 Vision.
     Uses HYBRID approach: extracted text (accurate) + image (for layout).
+    Successful results are cached by PDF content, so re-uploading the same
+    file returns immediately.
 
     Args:
         pdf_bytes: Raw PDF file bytes
         api_key: OpenAI API key
+        client: Optional long-lived OpenAI client; defaults to a pooled
+            client shared per api_key
 
     Returns:
         dict with extracted data or error information
     """
+    key = hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(key)
+        if cached is not None:
+            _RESULT_CACHE.move_to_end(key)
+            return copy.deepcopy(cached)
+
+    result = _extract_data_from_pdf(pdf_bytes, api_key, client)
+
+    if result.get("success"):
+        with _RESULT_CACHE_LOCK:
+            _RESULT_CACHE[key] = copy.deepcopy(result)
+            _RESULT_CACHE.move_to_end(key)
+            while len(_RESULT_CACHE) > _RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+
+    return result
+
+
+def _extract_data_from_pdf(pdf_bytes: bytes, api_key: str, client: Optional[OpenAI]) -> dict:
+    """Uncached body of extract_data_from_pdf"""
     raw_response = None
 
     try:
-        # Extract text directly from PDF (100% accurate - no OCR errors)
-        extracted_text = extract_text_from_pdf(pdf_bytes, max_pages=2)
-
-        # Convert PDF to images (for layout understanding)
-        images = pdf_to_images(pdf_bytes, max_pages=2)
+        # Parse the PDF once for both text and images
+        with _MUPDF_LOCK:
+            doc = _open_pdf(pdf_bytes)
+            try:
+                # Extract text directly from PDF (100% accurate - no OCR errors)
+                extracted_text = _extract_text(doc, max_pages=2)
+
+                # Cleanly structured documents can be parsed without calling GPT
+                fast_data = _try_fast_extract(extracted_text, load_state_mapping())
+                if fast_data is not None:
+                    return {
+                        "success": True,
+                        "data": fast_data
+                    }
+
+                # Convert PDF to images (for layout understanding only - values come
+                # from the text, so small low-detail images are enough)
+                images = _render_pages(doc, max_pages=2, max_size=LAYOUT_IMAGE_MAX_SIZE)
+            finally:
+                doc.close()
+                _empty_mupdf_store()
 
         if not images:
             return {"success": False, "error": "Could not convert PDF to images"}
 
         # Prepare image content for API
         image_content = []
-        for page_num, img in images:
-            b64_image = image_to_base64(img)
+        for page_num, jpeg_bytes in images:
+            b64_image = _b64.b64encode(jpeg_bytes).decode('ascii')
             image_content.append({
                 "type": "image_url",
                 "image_url": {
                     "url": f"data:image/jpeg;base64,{b64_image}",
-                    "detail": "high"
+                    "detail": LAYOUT_IMAGE_DETAIL
                 }
             })
 
-        # Initialize OpenAI client
-        client = OpenAI(api_key=api_key)
+        # Get (pooled) OpenAI client
+        if client is None:
+            client = _get_client(api_key)
 
         # Build user message with both extracted text and images
         # Note: Using string concatenation instead of f-string to avoid issues with { } in extracted text
@@ -340,10 +717,18 @@ def extract_data_from_pdf(pdf_bytes: bytes, api_key: str) -> dict:
 
         # Clean up response (remove markdown code blocks if present)
         if raw_response.startswith("```"):
-            raw_response = re.sub(r'^```json?\n?', '', raw_response)
-            raw_response = re.sub(r'\n?```$', '', raw_response)
-
-        extracted_data = json.loads(raw_response)
+            raw_response = raw_response[3:]
+            if raw_response[:4].lower() == "json":
+                raw_response = raw_response[4:]
+            raw_response = raw_response.lstrip("\n")
+            if raw_response.endswith("```"):
+                raw_response = raw_response[:-3].rstrip("\n")
+
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError, so the handler below covers both
+        if ORJSON_AVAILABLE:
+            extracted_data = orjson.loads(raw_response)
+        else:
+            extracted_data = json.loads(raw_response)
 
         # Post-process: normalize state names
         state_mapping = load_state_mapping()
@@ -1,17 +1,38 @@
 """PDF generation using WeasyPrint"""
 
-from flask import render_template
-from io import BytesIO
+from flask import current_app
+import base64
 import os
 
 # Try to import WeasyPrint, but don't fail if it's not installed
 try:
     from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
     WEASYPRINT_AVAILABLE = True
 except (ImportError, OSError) as e:
     WEASYPRINT_AVAILABLE = False
     print(f"WeasyPrint not available: {e}. Will return HTML instead.")
 
+# Font discovery is expensive; share one font configuration across all PDFs
+_FONT_CONFIG = FontConfiguration() if WEASYPRINT_AVAILABLE else None
+
+# Base path for static files and the signature image, resolved once
+_BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SIGNATURE_PATH = os.path.join(_BASE_PATH, 'static', 'images', 'signature.png')
+
+
+def _png_data_uri(path):
+    """Return a PNG file as a data: URI, or None if the file doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return 'data:image/png;base64,' + base64.b64encode(f.read()).decode('ascii')
+
+
+# Signature embedded as a data URI so WeasyPrint doesn't re-read it for every PDF.
+# In HTML mode the browser fetches /static instead (cacheable, keeps responses small).
+_SIGNATURE_SRC = _png_data_uri(_SIGNATURE_PATH) if WEASYPRINT_AVAILABLE else None
+
 def generate_invoice_pdf(data):
     """
     Generate PDF from HTML template using WeasyPrint.
@@ -28,38 +49,30 @@ def generate_invoice_pdf(data):
             - company_info
 
     Returns:
-        BytesIO: PDF file as bytes
+        bytes: PDF file (or UTF-8 HTML if WeasyPrint is unavailable)
     """
     try:
-        # Get base path for static files
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-        # Add paths to logo and signature images
-        data['logo_path'] = os.path.join(base_path, 'static', 'images', 'logo.png')
-        data['signature_path'] = os.path.join(base_path, 'static', 'images', 'signature.png')
+        # Add signature image path and source
+        data['signature_path'] = _SIGNATURE_PATH
+        data['signature_src'] = _SIGNATURE_SRC
 
-        # Render HTML template with data
-        html_string = render_template('invoice_template.html', **data)
+        # Render HTML template with data (Jinja caches the compiled template)
+        template = current_app.jinja_env.get_template('invoice_template.html')
+        html_string = template.render(**data)
 
         if WEASYPRINT_AVAILABLE:
             try:
-                # Generate PDF using WeasyPrint
-                pdf_bytes = HTML(string=html_string, base_url=base_path).write_pdf()
-                pdf_file = BytesIO(pdf_bytes)
-                return pdf_file
+                # Generate PDF using WeasyPrint (write_pdf() with no target returns bytes)
+                return HTML(string=html_string, base_url=_BASE_PATH).write_pdf(
+                    font_config=_FONT_CONFIG
+                )
             except Exception as pdf_error:
                 print(f"WeasyPrint PDF generation failed: {pdf_error}")
                 # Fall back to HTML
-                pdf_file = BytesIO()
-                pdf_file.write(html_string.encode('utf-8'))
-                pdf_file.seek(0)
-                return pdf_file
+                return html_string.encode('utf-8')
         else:
             # Return HTML as placeholder for testing
-            pdf_file = BytesIO()
-            pdf_file.write(html_string.encode('utf-8'))
-            pdf_file.seek(0)
-            return pdf_file
+            return html_string.encode('utf-8')
 
     except Exception as e:
         print(f"Error generating PDF: {e}")
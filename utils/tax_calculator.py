@@ -24,32 +24,18 @@ def calculate_tax(supplier_state, customer_state, subtotal):
         }
     """
     # Normalize state names for comparison
-    supplier_normalized = supplier_state.strip().lower()
-    customer_normalized = customer_state.strip().lower()
+    same_state = supplier_state.strip().casefold() == customer_state.strip().casefold()
 
-    if supplier_normalized == customer_normalized:
-        # Same state = CGST + SGST (9% each)
-        cgst = round(subtotal * 0.09, 2)
-        sgst = round(subtotal * 0.09, 2)
-        total_tax = cgst + sgst
+    # Same state = CGST + SGST (9% each), different state = IGST (18%)
+    half_tax = round(subtotal * 0.09, 2) if same_state else 0
+    igst = 0 if same_state else round(subtotal * 0.18, 2)
+    total_tax = half_tax + half_tax + igst
 
-        return {
-            'tax_type': 'SGST',
-            'cgst': cgst,
-            'sgst': sgst,
-            'igst': 0,
-            'total_tax': total_tax,
-            'total_after_tax': round(subtotal + total_tax, 2)
-        }
-    else:
-        # Different state = IGST (18%)
-        igst = round(subtotal * 0.18, 2)
-
-        return {
-            'tax_type': 'IGST',
-            'cgst': 0,
-            'sgst': 0,
-            'igst': igst,
-            'total_tax': igst,
-            'total_after_tax': round(subtotal + igst, 2)
-        }
+    return {
+        'tax_type': 'SGST' if same_state else 'IGST',
+        'cgst': half_tax,
+        'sgst': half_tax,
+        'igst': igst,
+        'total_tax': total_tax,
+        'total_after_tax': round(subtotal + total_tax, 2)
+    }